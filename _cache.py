@@ -0,0 +1,26 @@
+"""
+Cache Configuration
+Dogpile cache region backed by the cachefile.dbm next to the scripts, shared with subliminal's cache.
+"""
+
+import os
+
+from dogpile.cache import make_region
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+cache_file = os.path.join(script_dir, 'cachefile.dbm')
+
+# Own region rather than subliminal's, so scripts that only probe media don't import subliminal.
+# dogpile's dbm backend locks the file, so it can be shared with subliminal's region.
+region = make_region()
+
+
+def configure_region():
+    """
+    Configure the shared cache region once per process and return it
+    """
+    if not region.is_configured:
+        # Without the file-wide dogpile lock, misses for different keys (e.g. parallel ffprobes)
+        # are not serialized; dogpile falls back to a per-key in-process lock
+        region.configure('dogpile.cache.dbm', arguments={'filename': cache_file, 'dogpile_lockfile': False})
+    return region
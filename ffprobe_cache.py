@@ -0,0 +1,35 @@
+"""
+FFprobe Cache
+Persists raw ffprobe output in the shared cache region so unchanged media files are not probed again across runs.
+"""
+
+import hashlib
+import subprocess
+
+from _cache import configure_region
+
+region = configure_region()
+
+
+def cache_key(cmd, size, mtime_ns):
+    """
+    Build the cache key from the full command (which includes the path) and the file identity
+    """
+    digest = hashlib.blake2b(f"{' '.join(cmd)}:{size}:{mtime_ns}".encode()).hexdigest()
+    return f"ffprobe:{digest}"
+
+
+def run_ffprobe(cmd, size, mtime_ns):
+    """
+    Run an ffprobe command and return its stdout, reusing the cached output while
+    the file size and modification time are unchanged.
+
+    Args:
+        cmd (list): ffprobe command line.
+        size (int): File size in bytes.
+        mtime_ns (int): File modification time in nanoseconds.
+    """
+    def probe():
+        return subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+
+    return region.get_or_create(cache_key(cmd, size, mtime_ns), probe)
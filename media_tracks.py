@@ -8,24 +8,42 @@ import sys
 import subprocess
 import json
 import argparse
+import functools
 from pathlib import Path
 
+from ffprobe_cache import run_ffprobe
+
+SHOW_ENTRIES = (
+    'format=format_name,duration,bit_rate'
+    ':stream=index,codec_type,codec_name,width,height,r_frame_rate,bit_rate,duration,channels,sample_rate'
+    ':stream_tags=language,lang,title,handler_name'
+    ':stream_disposition=default,forced'
+)
+
+@functools.lru_cache(maxsize=256)
+def _ffprobe_cached(path_str, size, mtime_ns):
+    """
+    Run ffprobe and return its raw JSON output, memoized by file identity
+    """
+    cmd = [
+        'ffprobe',
+        '-v', 'quiet',
+        '-print_format', 'json',
+        # Only request the fields the analyzers below read
+        '-show_entries', SHOW_ENTRIES,
+        path_str
+    ]
+
+    return run_ffprobe(cmd, size, mtime_ns)
+
+
 def get_ffprobe_info(video_path):
     """
     Use ffprobe to get detailed media information
     """
     try:
-        cmd = [
-            'ffprobe',
-            '-v', 'quiet',
-            '-print_format', 'json',
-            '-show_format',
-            '-show_streams',
-            str(video_path)
-        ]
-
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return json.loads(result.stdout)
+        stat = Path(video_path).stat()
+        return json.loads(_ffprobe_cached(str(video_path), stat.st_size, stat.st_mtime_ns))
     except subprocess.CalledProcessError as e:
         print(f"Error running ffprobe: {e}")
         return None
@@ -199,7 +217,20 @@ def analyze_subtitle_streams(streams):
     return subtitle_streams
 
 
-def print_table(title, data, headers):
+def print_grid(rows, headers):
+    """
+    Print rows as plain aligned columns, without the tabulate import cost
+    """
+    headers = [str(header) for header in headers]
+    rows = [['' if cell is None else str(cell) for cell in row] for row in rows]
+    widths = [max(map(len, column)) for column in zip(headers, *rows)]
+
+    lines = [' | '.join(cell.ljust(width) for cell, width in zip(row, widths)) for row in [headers] + rows]
+    lines.insert(1, '-+-'.join('-' * width for width in widths))
+    print('\n'.join(lines))
+
+
+def print_table(title, data, headers, pretty=False):
     """
     Print a formatted table
     """
@@ -217,8 +248,11 @@ def print_table(title, data, headers):
         table_data.append(row)
 
     # Print table with proper formatting
-    from tabulate import tabulate
-    print(tabulate(table_data, headers=headers, tablefmt='grid'))
+    if pretty:
+        from tabulate import tabulate
+        print(tabulate(table_data, headers=headers, tablefmt='grid'))
+    else:
+        print_grid(table_data, headers)
 
 def get_media_info(video_path: Path):
     if not video_path.exists():
@@ -227,7 +261,7 @@ def get_media_info(video_path: Path):
 
     return get_ffprobe_info(video_path)
 
-def print_media_file(video_path):
+def print_media_file(video_path, pretty=False):
     """
     Main function to analyze a media file
     """
@@ -261,13 +295,13 @@ def print_media_file(video_path):
 
     # Print results
     print_table("Video Streams", video_streams,
-                ['Index', 'Codec', 'Resolution', 'FPS', 'Bitrate', 'Duration'])
+                ['Index', 'Codec', 'Resolution', 'FPS', 'Bitrate', 'Duration'], pretty)
 
     print_table("Audio Streams", audio_streams,
-                ['Index', 'Codec', 'Channels', 'Sample Rate', 'Bitrate', 'Language', 'Title', 'Duration'])
+                ['Index', 'Codec', 'Channels', 'Sample Rate', 'Bitrate', 'Language', 'Title', 'Duration'], pretty)
 
     print_table("Subtitle Streams", subtitle_streams,
-                ['Index', 'Codec', 'Language', 'Title', 'Flags', 'Duration'])
+                ['Index', 'Codec', 'Language', 'Title', 'Flags', 'Duration'], pretty)
 
     return True
 
@@ -284,6 +318,7 @@ Examples:
   python media-tracks.py video.mkv
   python media-tracks.py "C:\\Movies\\video.mp4"
   python media-tracks.py --file video.avi
+  python media-tracks.py --pretty video.mkv
         """
     )
 
@@ -299,6 +334,12 @@ Examples:
         help='Video file to analyze (alternative to positional argument)'
     )
 
+    parser.add_argument(
+        '--pretty',
+        action='store_true',
+        help='Render tables with tabulate grid borders'
+    )
+
     args = parser.parse_args()
 
     # Determine which file to analyze
@@ -310,7 +351,7 @@ Examples:
         return 1
 
     try:
-        success = print_media_file(video_file)
+        success = print_media_file(video_file, args.pretty)
         return 0 if success else 1
     except KeyboardInterrupt:
         print("\nOperation cancelled by user.")
@@ -0,0 +1,274 @@
+"""
+PGS OCR
+Converts .sup (PGS) subtitle files to .srt in-process with Tesseract, without launching Subtitle Edit.
+Requires the optional tesserocr and Pillow packages.
+"""
+
+import struct
+import threading
+
+try:
+    import tesserocr
+    from PIL import Image, ImageOps
+except ImportError:
+    tesserocr = None
+
+# Segment types
+PALETTE_DEFINITION = 0x14
+OBJECT_DEFINITION = 0x15
+PRESENTATION_COMPOSITION = 0x16
+WINDOW_DEFINITION = 0x17
+END_OF_DISPLAY_SET = 0x80
+
+# PTS/DTS are expressed in 90 kHz ticks
+TICKS_PER_MILLISECOND = 90
+
+# How long to show a subtitle that is still on screen when the stream ends
+TRAILING_SUBTITLE_DURATION = 5000 * TICKS_PER_MILLISECOND
+
+# Matroska tags often use ISO 639-2/B codes, Tesseract names its models after the T codes
+TESSERACT_LANGUAGES = {
+    'alb': 'sqi',
+    'arm': 'hye',
+    'baq': 'eus',
+    'bur': 'mya',
+    'chi': 'chi_sim',
+    'zho': 'chi_sim',
+    'cze': 'ces',
+    'dut': 'nld',
+    'fre': 'fra',
+    'geo': 'kat',
+    'ger': 'deu',
+    'gre': 'ell',
+    'ice': 'isl',
+    'mac': 'mkd',
+    'mao': 'mri',
+    'may': 'msa',
+    'per': 'fas',
+    'rum': 'ron',
+    'slo': 'slk',
+    'tib': 'bod',
+    'wel': 'cym',
+}
+
+# One Tesseract instance per thread, created on first use and kept alive for later files
+_thread_local = threading.local()
+
+
+def is_available():
+    """
+    Check whether the optional OCR dependencies are installed
+    """
+    return tesserocr is not None
+
+
+def tesseract_language(language):
+    """
+    Map a subtitle track language code to the name of the matching Tesseract model
+    """
+    language = language.lower()
+    return TESSERACT_LANGUAGES.get(language, language)
+
+
+def read_segments(data):
+    """
+    Yield (pts, segment_type, payload) for every segment of a PGS stream
+    """
+    offset = 0
+    while offset + 13 <= len(data):
+        magic, pts, _dts, segment_type, size = struct.unpack_from('>2sIIBH', data, offset)
+        if magic != b'PG':
+            raise ValueError(f"Invalid PGS segment header at offset {offset}")
+        offset += 13
+        yield pts, segment_type, data[offset:offset + size]
+        offset += size
+
+
+def parse_palette(payload):
+    """
+    Build a 256 entry lookup table mapping palette ids to grey levels
+    """
+    # Entries are (id, Y, Cr, Cb, alpha), only luminance and opacity matter for OCR
+    table = bytearray(256)
+    for i in range(2, len(payload) - 4, 5):
+        entry_id, luminance, _cr, _cb, alpha = payload[i:i + 5]
+        table[entry_id] = luminance * alpha // 255
+    return bytes(table)
+
+
+def decode_rle(data, width, height):
+    """
+    Decode PGS run-length encoded bitmap data into one palette id per pixel
+    """
+    pixels = bytearray()
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        i += 1
+        if byte:
+            pixels.append(byte)
+            continue
+
+        flag = data[i]
+        i += 1
+        if flag == 0:
+            # End of line
+            continue
+
+        length = flag & 0x3F
+        if flag & 0x40:
+            length = (length << 8) | data[i]
+            i += 1
+        color = 0
+        if flag & 0x80:
+            color = data[i]
+            i += 1
+        pixels.extend(bytes((color,)) * length)
+
+    size = width * height
+    return bytes(pixels[:size].ljust(size, b'\x00'))
+
+
+def parse_composition(payload):
+    """
+    Return the composition state, palette id and (object_id, y) placements of a composition segment
+    """
+    state = payload[7]
+    palette_id = payload[9]
+    count = payload[10]
+
+    placements = []
+    offset = 11
+    for _ in range(count):
+        object_id, _window_id, flags, _x, y = struct.unpack_from('>HBBHH', payload, offset)
+        placements.append((object_id, y))
+        offset += 16 if flags & 0x40 else 8
+    return state, palette_id, placements
+
+
+def read_display_sets(data):
+    """
+    Yield (start_pts, end_pts, bitmaps) for every subtitle shown in a PGS stream,
+    where bitmaps is a list of (width, height, grey pixels) ordered top to bottom
+    """
+    palettes = {}
+    objects = {}
+    pending = None
+    showing = None
+
+    for pts, segment_type, payload in read_segments(data):
+        if segment_type == PRESENTATION_COMPOSITION:
+            state, palette_id, placements = parse_composition(payload)
+            if state & 0x80:
+                # Epoch start, previously defined palettes and objects are discarded
+                palettes.clear()
+                objects.clear()
+            pending = (pts, palette_id, placements)
+
+        elif segment_type == PALETTE_DEFINITION:
+            palettes[payload[0]] = parse_palette(payload)
+
+        elif segment_type == OBJECT_DEFINITION:
+            object_id, _version, sequence = struct.unpack_from('>HBB', payload)
+            if sequence & 0x80:
+                width, height = struct.unpack_from('>HH', payload, 7)
+                objects[object_id] = (width, height, bytearray(payload[11:]))
+            elif object_id in objects:
+                objects[object_id][2].extend(payload[4:])
+
+        elif segment_type == END_OF_DISPLAY_SET and pending:
+            start_pts, palette_id, placements = pending
+            pending = None
+
+            palette = palettes.get(palette_id, bytes(256))
+            bitmaps = []
+            for object_id, _y in sorted(placements, key=lambda placement: placement[1]):
+                if object_id not in objects:
+                    continue
+                width, height, rle = objects[object_id]
+                bitmaps.append((width, height, decode_rle(rle, width, height).translate(palette)))
+
+            if showing and showing[1] == bitmaps:
+                # Acquisition points and palette-only updates re-show the same image, keep the entry
+                continue
+
+            # Any other composition replaces what is currently on screen
+            if showing:
+                yield showing[0], start_pts, showing[1]
+            showing = (start_pts, bitmaps) if bitmaps else None
+
+    # Truncated streams can end without a composition clearing the last subtitle
+    if showing:
+        end_pts = pending[0] if pending else showing[0] + TRAILING_SUBTITLE_DURATION
+        yield showing[0], end_pts, showing[1]
+
+
+def _tesseract_api(lang):
+    api = getattr(_thread_local, 'api', None)
+    if api is None or _thread_local.lang != lang:
+        if api is not None:
+            api.End()
+        api = tesserocr.PyTessBaseAPI(lang=lang)
+        _thread_local.api = api
+        _thread_local.lang = lang
+    return api
+
+
+def recognize(bitmaps, lang):
+    """
+    OCR the bitmaps of a display set and return the recognized lines
+    """
+    api = _tesseract_api(lang)
+    lines = []
+    for width, height, pixels in bitmaps:
+        # Subtitles are light text on a transparent background, Tesseract prefers dark on light
+        image = ImageOps.invert(Image.frombytes('L', (width, height), pixels))
+        api.SetImage(ImageOps.expand(image, border=10, fill=255))
+        text = api.GetUTF8Text().strip()
+        if text:
+            lines.append(text)
+    return '\n'.join(lines)
+
+
+def format_timestamp(pts):
+    """
+    Format a 90 kHz timestamp as an SRT timecode
+    """
+    milliseconds = pts // TICKS_PER_MILLISECOND
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+
+def pgs_to_srt(input_file, output_file, lang='eng'):
+    """
+    Convert a .sup (PGS) subtitle file to .srt with in-process Tesseract OCR.
+
+    Args:
+        input_file (str): Path to the .sup file.
+        output_file (str): Path to the output .srt file.
+        lang (str): Track language (ISO 639-2 B or T code), falls back to English when
+            Tesseract has no data for it.
+    """
+    if not is_available():
+        raise RuntimeError("pgs_ocr requires the tesserocr and Pillow packages")
+
+    requested_lang = lang
+    lang = tesseract_language(lang)
+    if lang not in tesserocr.get_languages()[1]:
+        print(f"Warning: no Tesseract data for language '{requested_lang}' ({lang}), using English for {input_file}")
+        lang = 'eng'
+
+    with open(input_file, 'rb') as file:
+        data = file.read()
+
+    entries = []
+    for start_pts, end_pts, bitmaps in read_display_sets(data):
+        text = recognize(bitmaps, lang)
+        if text:
+            entries.append(f"{len(entries) + 1}\n{format_timestamp(start_pts)} --> {format_timestamp(end_pts)}\n{text}\n")
+
+    with open(output_file, 'w', encoding='utf-8') as file:
+        file.write('\n'.join(entries))
+    print(f"OCR conversion complete: {output_file}")
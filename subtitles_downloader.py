@@ -2,21 +2,21 @@
 
 import os
 import argparse
+from datetime import timedelta
 from pathlib import Path
 
 from babelfish import Language
 from subliminal import download_best_subtitles, region, save_subtitles, scan_videos
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
-cache_file = os.path.join(script_dir, 'cachefile.dbm')
+from _cache import cache_file
 
 # Configure the cache
 region.configure('dogpile.cache.dbm', arguments={'filename': cache_file})
 
-def download_subtitles_for_videos(video_folder: Path, language_code: str):
+def download_subtitles_for_videos(video_folder: Path, language_code: str, age: timedelta = None):
     # Scan for videos and their existing subtitles
     print(f"Scanning for video files in {video_folder}")
-    videos = [video for video in scan_videos(video_folder) if "sample" not in video.name.lower()]
+    videos = [video for video in scan_videos(video_folder, age=age) if "sample" not in video.name.lower()]
 
     if not videos:
         print("No video files found in the specified folder.")
@@ -50,6 +50,7 @@ def main():
     parser = argparse.ArgumentParser(description="Download subtitles for video files in a directory.")
     parser.add_argument("directory", help="Path to the directory containing video files.")
     parser.add_argument("-l", "--language-code", default="por-BR", help="Subtitle language code (default: por-BR)")
+    parser.add_argument("--age", type=int, help="Only process videos modified in the last AGE days")
     args = parser.parse_args()
 
     video_folder = Path(os.path.abspath(args.directory))
@@ -60,7 +61,8 @@ def main():
         print(f"Error: The directory '{video_folder}' does not exist.")
         return
 
-    download_subtitles_for_videos(video_folder, language_code)
+    age = timedelta(days=args.age) if args.age else None
+    download_subtitles_for_videos(video_folder, language_code, age)
 
 if __name__ == "__main__":
     main()
@@ -4,11 +4,15 @@ import json
 import os
 import glob
 import argparse
-from subliminal import scan_videos
-from subliminal.subtitle import FORMAT_TO_EXTENSION
-from tabulate import tabulate
+import functools
+import asyncio
 import concurrent.futures
+from datetime import timedelta
+from subliminal import scan_videos
 from convert_sup_to_srt import convert_sup_to_srt
+import pgs_ocr
+from media_tracks import print_grid
+from ffprobe_cache import run_ffprobe
 
 FORMAT_TO_EXTENSION = {
     'srt': '.srt',
@@ -22,10 +26,11 @@ FORMAT_TO_EXTENSION = {
     'dvd_subtitle': '.sub',       # VOBSUB (DVD subtitles)
 }
 
-def list_subtitle_tracks(video_file):
-    if not os.path.isfile(video_file):
-        print(f"File not found: {video_file}")
-        return []
+# Image-based codecs that ffmpeg cannot encode to SRT, they need OCR
+BITMAP_SUBTITLE_CODECS = {'hdmv_pgs_subtitle', 'dvd_subtitle'}
+
+@functools.lru_cache(maxsize=256)
+def _ffprobe_cached(video_file, size, mtime_ns):
     cmd = [
         "ffprobe",
         "-v", "error",
@@ -34,18 +39,25 @@ def list_subtitle_tracks(video_file):
         "-of", "json",
         video_file
     ]
+    return run_ffprobe(cmd, size, mtime_ns)
+
+def list_subtitle_tracks(video_file):
+    if not os.path.isfile(video_file):
+        print(f"File not found: {video_file}")
+        return []
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        info = json.loads(result.stdout)
+        stat = os.stat(video_file)
+        info = json.loads(_ffprobe_cached(video_file, stat.st_size, stat.st_mtime_ns))
         streams = info.get("streams", [])
         tracks = []
         for index_position, stream in enumerate(streams):
             idx = stream.get("index")
             tags = stream.get("tags", {})
-            lang = tags.get("language", "unknown")
+            # Normalized and interned once so per-track comparisons and lookups stay cheap
+            lang = sys.intern(tags.get("language", "unknown").lower())
             title = tags.get("title", "")
             codec_type = stream.get("codec_type", "unknown")
-            codec_name = stream.get("codec_name", "unknown")
+            codec_name = sys.intern(stream.get("codec_name", "unknown").lower())
             tracks.append({
                 "index": idx,
                 "index_position": index_position,
@@ -62,38 +74,109 @@ def list_subtitle_tracks(video_file):
         print(f"JSON decode error: {e}")
         return []
 
-def extract_subtitle(video_file, stream_index_position, output_file):
+async def _run(cmd, capture_output=False):
+    print(f"Running: {' '.join(cmd)}")
+    # ffmpeg only logs to stderr, collect it in one read and show it when the command fails
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE if capture_output else asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    output, stderr = await process.communicate()
+    if process.returncode != 0:
+        print(stderr.decode(errors="replace"), end="")
+        raise subprocess.CalledProcessError(process.returncode, cmd, stderr=stderr)
+    return output
+
+async def extract_all_subtitles(video_file, outputs):
+    """
+    Extract several subtitle outputs from a video with a single ffmpeg invocation.
+
+    Args:
+        video_file (str): Path to the video file.
+        outputs (list): (stream_index_position, output_file, codec) tuples, where codec
+            is "copy" to keep the track as is or an ffmpeg subtitle encoder such as "srt".
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-y", "-i", video_file]
+    for stream_index_position, output_file, codec in outputs:
+        cmd.extend([
+            "-map", f"0:s:{stream_index_position}",
+            "-c:s", codec,
+            output_file
+        ])
+    await _run(cmd)
+
+async def extract_subtitle_to_srt(video_file, stream_index_position, output_file, codec="srt"):
+    """
+    Extract a text subtitle track as SRT through ffmpeg's stdout and write it in one go,
+    so a failed run never leaves a partial .srt behind.
+    """
     cmd = [
         "ffmpeg",
+        "-hide_banner",
+        "-nostats",
         "-i", video_file,
         "-map", f"0:s:{stream_index_position}",
-        "-c", "copy",
-        "-an", "-vn",
-        output_file,
-        "-y"
+        "-c:s", codec,
+        "-f", "srt",
+        "pipe:1"
     ]
-    print(f"Running: {' '.join(cmd)}")
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-    for line in process.stdout:
-        print(line, end="")
-    process.wait()
-    if process.returncode != 0:
-        raise subprocess.CalledProcessError(process.returncode, cmd)
+    output = await _run(cmd, capture_output=True)
+    with open(output_file, "wb") as file:
+        file.write(output)
 
-def convert_subtitle_to_srt(input_file, output_file):
+async def convert_subtitle_to_srt(input_file, output_file, ocr_executor=None, language="eng"):
     ext = os.path.splitext(input_file)[1].lower()
     if ext == ".sup":
         print(f"SUP detected, using OCR pipeline for {input_file}")
-        convert_sup_to_srt(input_file, output_file)
+        # OCR is blocking, keep it off the event loop
+        loop = asyncio.get_running_loop()
+        if pgs_ocr.is_available():
+            # In-process Tesseract, each OCR worker thread reuses its own engine
+            await loop.run_in_executor(ocr_executor, pgs_ocr.pgs_to_srt, input_file, output_file, language)
+        else:
+            await loop.run_in_executor(ocr_executor, convert_sup_to_srt, input_file, output_file)
         return
     cmd = [
         "ffmpeg",
+        "-hide_banner",
+        "-nostats",
         "-y",
         "-i", input_file,
         output_file
     ]
-    print(f"Running: {' '.join(cmd)}")
-    subprocess.run(cmd, check=True, capture_output=True, text=True)
+    await _run(cmd)
+
+def print_rows(rows, headers, pretty=False):
+    if pretty:
+        from tabulate import tabulate
+        print(tabulate(rows, headers=headers))
+    else:
+        print_grid(rows, headers)
+
+def srt_filepath(video_filepath, language):
+    filename_wo_ext = os.path.splitext(os.path.basename(video_filepath))[0]
+    return os.path.join(os.path.dirname(video_filepath), f"{filename_wo_ext}.{language}.srt")
+
+def is_srt_up_to_date(video_filepath, language):
+    """
+    Check the .srt.stamp sidecar written after a successful run against the video mtime.
+    A deleted .srt is never up to date, so removing it forces a redo.
+    """
+    subtitle_file_srt = srt_filepath(video_filepath, language)
+    if not os.path.exists(subtitle_file_srt):
+        return False
+
+    stamp_file = subtitle_file_srt + ".stamp"
+    try:
+        with open(stamp_file, "r") as stamp:
+            return stamp.read().strip() == str(os.stat(video_filepath).st_mtime_ns)
+    except OSError:
+        return False
+
+def write_srt_stamp(video_filepath, subtitle_file_srt):
+    with open(subtitle_file_srt + ".stamp", "w") as stamp:
+        stamp.write(str(os.stat(video_filepath).st_mtime_ns))
 
 def subtitle_track_selection(tracks, language):
     matching_tracks = [track for track in tracks if track["language"] == language]
@@ -103,7 +186,7 @@ def subtitle_track_selection(tracks, language):
 
     return matching_tracks[0]
 
-def process_video_file(video_filepath, language):
+async def process_video_file(video_filepath, tracks, language, pretty=False, ocr_executor=None):
     print(f"Processing video: {video_filepath}")
     result = {
         "video_filepath": video_filepath,
@@ -114,7 +197,13 @@ def process_video_file(video_filepath, language):
         "subtitle_file_srt": None
     }
 
-    tracks = list_subtitle_tracks(video_filepath)
+    if is_srt_up_to_date(video_filepath, language):
+        result["subtitle_file_srt"] = srt_filepath(video_filepath, language)
+        print(f"SRT subtitle file is up to date: {result['subtitle_file_srt']}")
+        result["status"] = "cached"
+        result["message"] = f"Up to date: {result['subtitle_file_srt']}"
+        return result
+
     if not tracks:
         print("No subtitle tracks found.")
         result["status"] = "no_tracks"
@@ -122,7 +211,7 @@ def process_video_file(video_filepath, language):
         return result
 
     print("Subtitle Tracks:")
-    print(tabulate(tracks, headers="keys"))
+    print_rows([list(track.values()) for track in tracks], list(tracks[0].keys()), pretty)
 
     track = subtitle_track_selection(tracks, language)
     if not track:
@@ -135,7 +224,7 @@ def process_video_file(video_filepath, language):
 
     print(f"Selected track: Index: {track['index']}, Title: '{track['title']}', Codec: {track['codec_name']}")
 
-    extension = FORMAT_TO_EXTENSION.get(track["codec_name"].lower(), ".srt")
+    extension = FORMAT_TO_EXTENSION.get(track["codec_name"], ".srt")
 
     if not extension:
         result["status"] = "unsupported_subtitle_format"
@@ -148,20 +237,42 @@ def process_video_file(video_filepath, language):
         f"{filename_wo_ext}.{track['language']}{extension}"
     )
 
-    subtitle_file_srt = os.path.join(
-        os.path.dirname(video_filepath),
-        f"{filename_wo_ext}.{track['language']}.srt"
-    )
+    subtitle_file_srt = srt_filepath(video_filepath, track["language"])
     result["subtitle_file_srt"] = subtitle_file_srt
 
-    result["subtitle_file_original"] = subtitle_file_original
-
     if os.path.exists(subtitle_file_srt):
         print(f"SRT subtitle file already exists: {subtitle_file_srt}")
         result["status"] = "srt_exists"
         result["message"] = f"SRT exists: {subtitle_file_srt}"
+        write_srt_stamp(video_filepath, subtitle_file_srt)
+        return result
+
+    if track["codec_name"] not in BITMAP_SUBTITLE_CODECS:
+        # Text tracks go straight from the video to SRT in a single ffmpeg run, no intermediate file
+        is_subrip = track["codec_name"] == "subrip"
+        print(f"Extracting subtitle track {track['index']} to {subtitle_file_srt}")
+        try:
+            await extract_subtitle_to_srt(
+                video_filepath, track["index_position"], subtitle_file_srt, "copy" if is_subrip else "srt"
+            )
+        except Exception as e:
+            result["status"] = "error"
+            result["message"] = f"Extraction failed: {e}"
+            return result
+
+        if is_subrip:
+            print(f"Subtitle is already in SRT format: {subtitle_file_srt}")
+            result["status"] = "already_srt"
+            result["message"] = f"Already SRT: {subtitle_file_srt}"
+        else:
+            print(f"Converted to SRT: {subtitle_file_srt}")
+            result["status"] = "converted"
+            result["message"] = f"Converted to SRT: {subtitle_file_srt}"
+        write_srt_stamp(video_filepath, subtitle_file_srt)
         return result
 
+    result["subtitle_file_original"] = subtitle_file_original
+
     if os.path.exists(subtitle_file_original):
         print(f"Subtitle {track['codec_name']} file already exists: {subtitle_file_original}")
         result["status"] = "already_extracted"
@@ -169,7 +280,7 @@ def process_video_file(video_filepath, language):
     else:
         print(f"Extracting subtitle track {track['index']} to {subtitle_file_original}")
         try:
-            extract_subtitle(video_filepath, track["index_position"], subtitle_file_original)
+            await extract_all_subtitles(video_filepath, [(track["index_position"], subtitle_file_original, "copy")])
             result["status"] = "extracted"
             result["message"] = f"Extracted to {subtitle_file_original}"
         except Exception as e:
@@ -177,55 +288,82 @@ def process_video_file(video_filepath, language):
             result["message"] = f"Extraction failed: {e}"
             return result
 
-    # Convert the extracted subtitle to SRT if it's not already SRT
-    if track["codec_name"].lower() != "subrip":
-        print(f"Converting {subtitle_file_original} to SRT: {subtitle_file_srt}")
-        try:
-            convert_subtitle_to_srt(subtitle_file_original, subtitle_file_srt)
-            print(f"Converted to SRT: {subtitle_file_srt}")
-            result["status"] = "converted"
-            result["message"] = f"Converted to SRT: {subtitle_file_srt}"
-        except Exception as e:
-            result["status"] = "error"
-            result["message"] = f"Conversion failed: {e}"
-    else:
-        print(f"Subtitle is already in SRT format: {subtitle_file_original}")
-        result["status"] = "already_srt"
-        result["message"] = f"Already SRT: {subtitle_file_original}"
+    # Image-based subtitles still need the OCR conversion step
+    print(f"Converting {subtitle_file_original} to SRT: {subtitle_file_srt}")
+    try:
+        await convert_subtitle_to_srt(subtitle_file_original, subtitle_file_srt, ocr_executor, track["language"])
+        print(f"Converted to SRT: {subtitle_file_srt}")
+        result["status"] = "converted"
+        result["message"] = f"Converted to SRT: {subtitle_file_srt}"
+        write_srt_stamp(video_filepath, subtitle_file_srt)
+    except Exception as e:
+        result["status"] = "error"
+        result["message"] = f"Conversion failed: {e}"
     return result
 
+async def probe_video_files(videos_filepaths, max_workers):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def bounded_list_subtitle_tracks(video_filepath):
+        async with semaphore:
+            return await loop.run_in_executor(None, list_subtitle_tracks, video_filepath)
+
+    tracks = await asyncio.gather(*(bounded_list_subtitle_tracks(video_filepath) for video_filepath in videos_filepaths))
+    return dict(zip(videos_filepaths, tracks))
+
+async def process_video_files(videos_filepaths, language, max_workers, ocr_workers, pretty=False):
+    # Probe every video up front so ffprobe startup overlaps across the whole folder
+    # Videos with an up to date stamp are skipped without spawning ffprobe
+    tracks_by_video = await probe_video_files(
+        [video_filepath for video_filepath in videos_filepaths if not is_srt_up_to_date(video_filepath, language)],
+        max_workers
+    )
+    semaphore = asyncio.Semaphore(max_workers)
+
+    # OCR is CPU and memory heavy, so it gets its own, smaller pool than the extraction jobs
+    with concurrent.futures.ThreadPoolExecutor(max_workers=ocr_workers) as ocr_executor:
+        async def bounded_process_video_file(video_filepath):
+            async with semaphore:
+                return await process_video_file(
+                    video_filepath, tracks_by_video.get(video_filepath, []), language, pretty, ocr_executor
+                )
+
+        return await asyncio.gather(*(bounded_process_video_file(video_filepath) for video_filepath in videos_filepaths))
+
 def main():
     parser = argparse.ArgumentParser(description="Extract and convert subtitles from video files.")
     parser.add_argument("directory", help="Path to the directory containing video files.")
     parser.add_argument("-l", "--language", default="eng", help="Subtitle language code (default: eng)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Number of videos to process concurrently (default: CPU count)")
+    parser.add_argument("--ocr-workers", type=int, default=max(1, (os.cpu_count() or 1) // 2), help="Number of SUP files to OCR in parallel (default: half the CPU count)")
+    parser.add_argument("--age", type=int, help="Only process videos modified in the last AGE days")
+    parser.add_argument("--pretty", action="store_true", help="Render tables with tabulate")
     args = parser.parse_args()
 
     video_folder = os.path.abspath(args.directory)
-    language = args.language
-    max_workers = 1
+    language = sys.intern(args.language.lower())
+    max_workers = max(1, args.jobs)
+    ocr_workers = max(1, args.ocr_workers)
+    age = timedelta(days=args.age) if args.age else None
 
     print(f"Video folder: {video_folder}")
     print(f"Language: {language}")
     print(f"Max workers: {max_workers}")
+    print(f"OCR workers: {ocr_workers}")
 
     if not os.path.isdir(video_folder):
         print(f"Error: The directory '{video_folder}' does not exist.")
         return
 
     print(f"Scanning for video files in {video_folder}")
-    videos_filepaths = [video.name for video in scan_videos(video_folder) if "sample" not in video.name]
+    videos_filepaths = [video.name for video in scan_videos(video_folder, age=age) if "sample" not in video.name]
     if not videos_filepaths:
         print("No video files found in the specified folder.")
         return
 
     print(f"Found {len(videos_filepaths)} video file(s).")
-    results = []
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_video = {executor.submit(process_video_file, video_filepath, language): video_filepath for video_filepath in videos_filepaths}
-        for future in concurrent.futures.as_completed(future_to_video):
-            result = future.result()
-            results.append(result)
+    results = asyncio.run(process_video_files(videos_filepaths, language, max_workers, ocr_workers, args.pretty))
 
     print("\nSummary:")
     summary_rows = []
@@ -238,7 +376,7 @@ def main():
             r.get("track", {}).get("codec_name") if r.get("track") else None,
             r["message"]
         ])
-    print(tabulate(summary_rows, headers=["Video", "Status", "TrackIdx", "Lang", "Codec", "Message"]))
+    print_rows(summary_rows, ["Video", "Status", "TrackIdx", "Lang", "Codec", "Message"], args.pretty)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
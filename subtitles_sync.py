@@ -1,9 +1,14 @@
 #!/usr/bin/python3 -u
 
 import os
+import re
+import asyncio
 import subprocess
 import chardet
+import codecs
+import mmap
 import shutil
+from pathlib import Path
 
 from subliminal import scan_videos
 
@@ -14,34 +19,63 @@ from subliminal import scan_videos
 video_extensions = ('.mp4', '.mkv', '.avi')
 subtitle_extensions = ('.srt', '.sub', '.txt')
 
+# Language code is the last dotted part before the extension, e.g. movie.pt-BR.srt
+subtitle_language_pattern = re.compile(r'^.+\.(?P<lang>[^.]+)\.(?:srt|sub|txt)$', re.IGNORECASE)
+
+# alass-cli decodes the whole audio track when syncing by video, keep parallel runs low by default
+default_max_parallel = 1
+
+# chardet only needs a prefix of the file to settle on an encoding
+encoding_detection_size = 64 * 1024
+
 def ensure_utf8_encoding(file_path):
-    # Detect the encoding of the subtitle file
     with open(file_path, 'rb') as file:
-        raw_data = file.read()
-        result = chardet.detect(raw_data)
-        encoding = result['encoding']
+        # A UTF-8 BOM settles it without reading the rest of the file
+        if file.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8:
+            return
+
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as raw_data:
+            # Nothing to rewrite if the file is already valid UTF-8 (or ASCII)
+            try:
+                str(raw_data, 'utf-8')
+                return
+            except UnicodeDecodeError:
+                pass
+
+            # Detect the encoding of the subtitle file
+            encoding = chardet.detect(raw_data[:encoding_detection_size])['encoding']
+            if encoding in (None, 'ascii'):
+                # The prefix was plain ASCII but the file is not UTF-8, look at all of it
+                encoding = chardet.detect(raw_data[:])['encoding']
+            if encoding in (None, 'ascii'):
+                encoding = 'cp1252'
+            content = str(raw_data, encoding, 'replace' if encoding == 'cp1252' else 'strict')
 
-    # Read the file with the detected encoding
-    with open(file_path, 'r', encoding=encoding) as file:
-        content = file.read()
+    # Write the content back as UTF-8, after the mapping is closed
+    Path(file_path).write_text(content, encoding='utf-8', newline='')
 
-    # Write the content back as UTF-8
-    with open(file_path, 'w', encoding='utf-8') as file:
-        file.write(content)
+async def _run(command):
+    process = await asyncio.create_subprocess_exec(*command)
+    returncode = await process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command)
 
-def synchronize_subtitles_by_video(video_file, subtitle_file, old_subtitles_dir, audio_index=None):
-    input_video_path = os.path.join(directory, video_file)
-    input_subtitle_path = os.path.join(directory, subtitle_file)
-    subtitle_name, subtitle_ext = os.path.splitext(subtitle_file)
-    temp_subtitle_path = os.path.join(directory, f"{subtitle_name}.temp{subtitle_ext}")
+def temp_subtitle_path_for(subtitle_path):
+    return subtitle_path.with_name(f"{subtitle_path.stem}.temp{subtitle_path.suffix}")
 
-    print(f"Synchronizing: {video_file} with {subtitle_file}")
+async def synchronize_subtitles_by_video(video_path, subtitle_path, old_subtitles_dir, audio_index=None):
+    temp_subtitle_path = temp_subtitle_path_for(subtitle_path)
+
+    print(f"Synchronizing: {video_path.name} with {subtitle_path.name}")
 
     # Ensure the subtitle file is encoded as UTF-8
     try:
-        ensure_utf8_encoding(input_subtitle_path)
+        ensure_utf8_encoding(subtitle_path)
     except Exception as e:
-        print(f"Error encoding subtitle file {subtitle_file} as UTF-8: {e}")
+        print(f"Error encoding subtitle file {subtitle_path.name} as UTF-8: {e}")
         return
 
     # Call the alass-cli command
@@ -49,123 +83,138 @@ def synchronize_subtitles_by_video(video_file, subtitle_file, old_subtitles_dir,
         command = ["alass-cli"]
         if audio_index is not None:
             command.extend(["--index", str(audio_index)])
-        command.extend([input_video_path, input_subtitle_path, temp_subtitle_path])
+        command.extend([str(video_path), str(subtitle_path), str(temp_subtitle_path)])
 
-        subprocess.run(command, check=True)
+        await _run(command)
         print(f"Synced subtitle saved to: {temp_subtitle_path}")
 
         # Move the original subtitle file to "old-subtitles" folder
-        old_subtitle_path = os.path.join(old_subtitles_dir, subtitle_file)
-        shutil.move(input_subtitle_path, old_subtitle_path)
+        shutil.move(str(subtitle_path), str(old_subtitles_dir / subtitle_path.name))
 
         # Move the temporary subtitle file to the original subtitle path
-        shutil.move(temp_subtitle_path, input_subtitle_path)
+        shutil.move(str(temp_subtitle_path), str(subtitle_path))
     except subprocess.CalledProcessError as e:
-        print(f"Error while syncing {video_file} and {subtitle_file}: {e}")
-        if os.path.exists(temp_subtitle_path):
-            os.remove(temp_subtitle_path)
+        print(f"Error while syncing {video_path.name} and {subtitle_path.name}: {e}")
+        if temp_subtitle_path.exists():
+            temp_subtitle_path.unlink()
 
-def synchronize_subtitles_by_reference(subtitle_file_to_sync, reference_subtitle_file, old_subtitles_dir):
-    # Prepare paths
-    input_subtitle_path = os.path.join(directory, subtitle_file_to_sync)
-    reference_subtitle_path = os.path.join(directory, reference_subtitle_file)
-    subtitle_name, subtitle_ext = os.path.splitext(subtitle_file_to_sync)
-    temp_subtitle_path = os.path.join(directory, f"{subtitle_name}.temp{subtitle_ext}")
+async def synchronize_subtitles_by_reference(subtitle_path, reference_subtitle_path, old_subtitles_dir):
+    temp_subtitle_path = temp_subtitle_path_for(subtitle_path)
 
-    print(f"Synchronizing: {subtitle_file_to_sync} with {reference_subtitle_file}")
+    print(f"Synchronizing: {subtitle_path.name} with {reference_subtitle_path.name}")
 
     # Ensure the subtitle file is encoded as UTF-8
     try:
-        ensure_utf8_encoding(input_subtitle_path)
+        ensure_utf8_encoding(subtitle_path)
     except Exception as e:
-        print(f"Error encoding subtitle file {subtitle_file_to_sync} as UTF-8: {e}")
+        print(f"Error encoding subtitle file {subtitle_path.name} as UTF-8: {e}")
         return
 
-
-
     # Call the alass-cli command: alass-cli reference_subtitle.ssa incorrect_subtitle.srt output.srt
     try:
-        command = ["alass-cli", reference_subtitle_path, input_subtitle_path, temp_subtitle_path]
-        subprocess.run(command, check=True)
+        command = ["alass-cli", str(reference_subtitle_path), str(subtitle_path), str(temp_subtitle_path)]
+        await _run(command)
         print(f"Synced subtitle saved to: {temp_subtitle_path}")
 
         # Move the original subtitle file to "old-subtitles" folder
-        old_subtitle_path = os.path.join(old_subtitles_dir, subtitle_file_to_sync)
-        shutil.move(input_subtitle_path, old_subtitle_path)
+        shutil.move(str(subtitle_path), str(old_subtitles_dir / subtitle_path.name))
 
         # Move the temporary subtitle file to the original subtitle path
-        shutil.move(temp_subtitle_path, input_subtitle_path)
+        shutil.move(str(temp_subtitle_path), str(subtitle_path))
     except subprocess.CalledProcessError as e:
-        print(f"Error while syncing {subtitle_file_to_sync} and {reference_subtitle_file}: {e}")
-        if os.path.exists(temp_subtitle_path):
-            os.remove(temp_subtitle_path)
+        print(f"Error while syncing {subtitle_path.name} and {reference_subtitle_path.name}: {e}")
+        if temp_subtitle_path.exists():
+            temp_subtitle_path.unlink()
+
+
+async def run_synchronizations(synchronizations, max_parallel):
+    semaphore = asyncio.Semaphore(max_parallel)
+
+    async def bounded_synchronization(synchronization):
+        async with semaphore:
+            await synchronization
+
+    await asyncio.gather(*(bounded_synchronization(s) for s in synchronizations))
 
 
-def process_files(directory, target_language, reference_language, audio_index=None):
+def process_files(directory, target_language, reference_language, audio_index=None, max_parallel=default_max_parallel):
     """
     Synchronize subtitles for all video files in the given directory.
 
     Parameters:
     directory (str): The path to the directory containing video and subtitle files.
     audio_index (int, optional): The index of the audio track to use for synchronization.
+    max_parallel (int, optional): How many alass-cli runs may execute at the same time.
 
     """
-    # List all files in the directory
-    files = os.listdir(directory)
-
-    videos = [video.name for video in scan_videos(directory) if "sample" not in video.name.lower()]
-
-    # Separate video and subtitle files
-    # videos = [f for f in files if f.lower().endswith(video_extensions)]
-    subtitle_files = [f for f in files if f.lower().endswith(subtitle_extensions)]
+    dir_path = Path(directory)
+    # scan_videos already yields paths inside the directory
+    video_paths = [Path(video.name) for video in scan_videos(directory) if "sample" not in video.name.lower()]
+
+    # Collect subtitle files in a single pass over the directory
+    with os.scandir(directory) as entries:
+        subtitle_files = [
+            entry.name for entry in entries
+            if entry.name.lower().endswith(subtitle_extensions) and entry.is_file()
+        ]
 
-    print(f"Number of video files: {len(videos)}")
+    # Index subtitles as basename -> {language -> subtitle}, under every dotted prefix of
+    # their name so "movie.eng.srt" and "movie.part1.eng.srt" are both found from "movie"
+    subtitles_index = {}
+    for subtitle_file in subtitle_files:
+        match = subtitle_language_pattern.match(subtitle_file)
+        if not match:
+            continue
+        language = match.group('lang').lower()
+        parts = os.path.splitext(subtitle_file)[0].split('.')
+        for i in range(1, len(parts) + 1):
+            # The first subtitle found for a language wins
+            subtitles_index.setdefault('.'.join(parts[:i]), {}).setdefault(language, subtitle_file)
+
+    # Build every subtitle path once, sync functions only take Path objects
+    subtitle_paths = {subtitle_file: dir_path / subtitle_file for subtitle_file in subtitle_files}
+
+    target_language_lower = target_language.lower()
+    reference_language_lower = reference_language.lower()
+
+    print(f"Number of video files: {len(video_paths)}")
     print(f"Number of subtitle files: {len(subtitle_files)}")
 
     # Create "old-subtitles" folder if it doesn't exist
-    old_subtitles_dir = os.path.join(directory, "old-subtitles")
-    if not os.path.exists(old_subtitles_dir):
-        os.makedirs(old_subtitles_dir)
+    old_subtitles_dir = dir_path / "old-subtitles"
+    old_subtitles_dir.mkdir(parents=True, exist_ok=True)
 
     # Match video files with subtitles by their filenames (ignoring extensions and language codes)
-    for video_file in videos:
-        video_basename, _ = os.path.splitext(os.path.basename(video_file))
-        # Match subtitles that start with the video_basename and have a language code (or not) before the extension
-        matching_subtitles = [
-            s for s in subtitle_files
-            if os.path.splitext(s)[0] == video_basename or os.path.splitext(s)[0].startswith(video_basename + ".")
-        ]
+    synchronizations = []
+    for video_path in video_paths:
+        video_file = video_path.name
+        video_basename = video_path.stem
+        # Subtitles that start with the video_basename, keyed by their language code
+        matching_subtitles = subtitles_index.get(video_basename, {})
 
-        # Try to find a subtitle that matches the target language
-        subtitle_file_to_sync = None
-        for s in matching_subtitles:
-            parts = os.path.splitext(s)[0].split('.')
-            if len(parts) > 1 and parts[-1].lower() == target_language.lower():
-                subtitle_file_to_sync = s
-                break
-
-        reference_subtitle_file = None
-        for s in matching_subtitles:
-            parts = os.path.splitext(s)[0].split('.')
-            if len(parts) > 1 and parts[-1].lower() == reference_language.lower():
-                reference_subtitle_file = s
-                break
+        subtitle_file_to_sync = matching_subtitles.get(target_language_lower)
+        reference_subtitle_file = matching_subtitles.get(reference_language_lower)
 
         if not subtitle_file_to_sync:
             print(f"No subtitle found for {video_file} with language {target_language}.")
-            return
+            break
 
         if reference_subtitle_file:
             print(f"Found reference subtitle: {reference_subtitle_file} for {video_file}")
-            synchronize_subtitles_by_reference(subtitle_file_to_sync, reference_subtitle_file, old_subtitles_dir)
+            synchronizations.append(
+                synchronize_subtitles_by_reference(
+                    subtitle_paths[subtitle_file_to_sync], subtitle_paths[reference_subtitle_file], old_subtitles_dir
+                )
+            )
         else:
-            if not subtitle_file_to_sync and matching_subtitles:
-                subtitle_file_to_sync = matching_subtitles[0]
+            synchronizations.append(
+                synchronize_subtitles_by_video(
+                    video_path, subtitle_paths[subtitle_file_to_sync], old_subtitles_dir, audio_index
+                )
+            )
 
-            if matching_subtitles:
-                synchronize_subtitles_by_video(video_file, subtitle_file_to_sync, old_subtitles_dir, audio_index)
-            else:
-                print(f"No matching subtitle found for: {video_file}")
+    # alass-cli runs are independent per video, overlap them
+    asyncio.run(run_synchronizations(synchronizations, max(1, max_parallel)))
 
 if __name__ == "__main__":
     # Get directory input from the user
@@ -173,7 +222,9 @@ if __name__ == "__main__":
     audio_index = input("Enter the audio index (or press Enter to skip): ").strip()
     reference_language = input("Enter the reference language: ").strip()
     target_language = input("Enter the language to sync: ").strip()
+    max_parallel = input(f"Enter how many syncs to run in parallel (or press Enter for {default_max_parallel}): ").strip()
     audio_index = int(audio_index) if audio_index else None
+    max_parallel = int(max_parallel) if max_parallel else default_max_parallel
 
     if not target_language:
         print("No target language provided. Exiting.")
@@ -181,6 +232,6 @@ if __name__ == "__main__":
 
     # Check if the directory exists
     if os.path.isdir(directory):
-        process_files(directory, target_language, reference_language, audio_index)
+        process_files(directory, target_language, reference_language, audio_index, max_parallel)
     else:
         print(f"The directory {directory} does not exist.")
@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import _cache
+
+ffprobe_cache = None
+temp_dir = None
+
+
+def setUpModule():
+    global ffprobe_cache, temp_dir
+    # Point the shared region at a throwaway file before ffprobe_cache configures it
+    temp_dir = tempfile.TemporaryDirectory()
+    _cache.cache_file = os.path.join(temp_dir.name, 'cachefile.dbm')
+    import ffprobe_cache as module
+    ffprobe_cache = module
+
+
+def tearDownModule():
+    temp_dir.cleanup()
+
+
+def slow_command(output):
+    return [sys.executable, '-c', f"import time; time.sleep(0.5); print({output!r})"]
+
+
+class FfprobeCacheTests(unittest.TestCase):
+
+    def test_result_is_cached(self):
+        cmd = slow_command('cached')
+        self.assertEqual(ffprobe_cache.run_ffprobe(cmd, 1, 1), 'cached\n')
+
+        start = time.monotonic()
+        self.assertEqual(ffprobe_cache.run_ffprobe(cmd, 1, 1), 'cached\n')
+        self.assertLess(time.monotonic() - start, 0.4)
+
+    def test_concurrent_misses_overlap(self):
+        results = {}
+
+        def probe(name):
+            results[name] = ffprobe_cache.run_ffprobe(slow_command(name), 2, 2)
+
+        threads = [threading.Thread(target=probe, args=(name,)) for name in ('first', 'second')]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {'first': 'first\n', 'second': 'second\n'})
+        self.assertLess(time.monotonic() - start, 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import struct
+import unittest
+
+import pgs_ocr
+
+
+def segment(pts, segment_type, payload):
+    return struct.pack('>2sIIBH', b'PG', pts, 0, segment_type, len(payload)) + payload
+
+
+def composition(number, state, object_ids):
+    payload = struct.pack('>HHBHBBBB', 4, 2, 0x10, number, state, 0, 0, len(object_ids))
+    for object_id in object_ids:
+        payload += struct.pack('>HBBHH', object_id, 0, 0, 0, 5)
+    return payload
+
+
+# 4x2 bitmap: a color 1 pixel followed by a run of 3 transparent pixels, then a run of 4 color 1 pixels
+RLE = bytes([1, 0, 3, 0, 0, 0, 0x84, 1, 0, 0])
+PALETTE = bytes([0, 0]) + bytes([1, 235, 128, 128, 255])
+OBJECT = struct.pack('>HBB', 1, 0, 0xC0) + (len(RLE) + 4).to_bytes(3, 'big') + struct.pack('>HH', 4, 2) + RLE
+PIXELS = b'\xeb\x00\x00\x00\xeb\xeb\xeb\xeb'
+
+
+def display_set(pts, state=0x80):
+    return (
+        segment(pts, pgs_ocr.PRESENTATION_COMPOSITION, composition(0, state, [1]))
+        + segment(pts, pgs_ocr.PALETTE_DEFINITION, PALETTE)
+        + segment(pts, pgs_ocr.OBJECT_DEFINITION, OBJECT)
+        + segment(pts, pgs_ocr.END_OF_DISPLAY_SET, b'')
+    )
+
+
+class PgsOcrTests(unittest.TestCase):
+
+    def test_decode_rle(self):
+        self.assertEqual(pgs_ocr.decode_rle(RLE, 4, 2), b'\x01\x00\x00\x00\x01\x01\x01\x01')
+
+    def test_parse_palette(self):
+        self.assertEqual(pgs_ocr.parse_palette(PALETTE)[1], 235)
+
+    def test_invalid_segment_header(self):
+        with self.assertRaises(ValueError):
+            list(pgs_ocr.read_segments(b'XX' + bytes(11)))
+
+    def test_display_set_ends_at_next_composition(self):
+        data = (
+            display_set(90000)
+            + segment(270045, pgs_ocr.PRESENTATION_COMPOSITION, composition(1, 0, []))
+            + segment(270045, pgs_ocr.END_OF_DISPLAY_SET, b'')
+        )
+        self.assertEqual(list(pgs_ocr.read_display_sets(data)), [(90000, 270045, [(4, 2, PIXELS)])])
+
+    def test_repeated_display_set_extends_entry(self):
+        data = (
+            display_set(90000)
+            + display_set(180000, state=0x40)
+            + segment(270000, pgs_ocr.PRESENTATION_COMPOSITION, composition(2, 0, []))
+            + segment(270000, pgs_ocr.END_OF_DISPLAY_SET, b'')
+        )
+        self.assertEqual(list(pgs_ocr.read_display_sets(data)), [(90000, 270000, [(4, 2, PIXELS)])])
+
+    def test_trailing_display_set_is_kept(self):
+        sets = list(pgs_ocr.read_display_sets(display_set(90000)))
+        self.assertEqual(sets, [(90000, 90000 + pgs_ocr.TRAILING_SUBTITLE_DURATION, [(4, 2, PIXELS)])])
+
+    def test_tesseract_language(self):
+        self.assertEqual(pgs_ocr.tesseract_language('ger'), 'deu')
+        self.assertEqual(pgs_ocr.tesseract_language('CHI'), 'chi_sim')
+        self.assertEqual(pgs_ocr.tesseract_language('por'), 'por')
+
+    def test_format_timestamp(self):
+        self.assertEqual(pgs_ocr.format_timestamp(270045), '00:00:03,000')
+        self.assertEqual(pgs_ocr.format_timestamp(90 * 3723004), '01:02:03,004')
+
+
+if __name__ == '__main__':
+    unittest.main()